@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк режимов загрузки коммитов
+Прогоняет загрузку одного репозитория Azure DevOps в каждом режиме и печатает время и число запросов,
+затем сравнивает транспорты HTTP_BACKEND (requests и http2) на параллельных загрузках
+
+    python scripts/benchmark_fetch.py <project> <repo_id> [--days 365] [--runs 3] [--parallel 16]
+"""
+
+import argparse
+import statistics
+import time
+from datetime import datetime, timedelta
+
+import generate_heatmap as gh
+
+
+def bench_azure(project: str, repo_id: str, from_date: datetime, runs: int, author: str = None):
+    print(f"Azure DevOps {project}/{repo_id}, since {from_date.date()}, author={author or 'any'}")
+    for api, pagination in [(a, p) for a in ("get", "batch") for p in ("skip", "cursor")]:
+        gh.AZURE_COMMITS_API = api
+        gh.AZURE_PAGINATION = pagination
+        timings = []
+        for _ in range(runs):
+            client = gh.azure_client()
+            requests_before = client.stats["requests"]
+            started = time.monotonic()
+            commits = gh.get_azure_commits(project, repo_id, from_date, author)
+            timings.append(time.monotonic() - started)
+            requests_made = client.stats["requests"] - requests_before
+        print(f"   {api:<6} {pagination:<7} median {statistics.median(timings):6.2f}s  "
+              f"{len(commits)} commits  {requests_made} requests/run")
+
+
+def bench_backends(project: str, repo_id: str, from_date: datetime, runs: int, parallel: int, author: str = None):
+    print(f"HTTP backends, {parallel} concurrent fetches of {project}/{repo_id}")
+    for backend in ("requests", "http2"):
+        if backend == "http2" and gh.httpx is None:
+            print("   http2    skipped: httpx is not installed (pip install 'httpx[http2]')")
+            continue
+        gh.HTTP_BACKEND = backend
+        gh.azure_client.cache_clear()
+        client = gh.azure_client()
+        timings = []
+        for _ in range(runs):
+            started = time.monotonic()
+            gh.run_parallel(lambda _: gh.get_azure_commits(project, repo_id, from_date, author),
+                            range(parallel), parallel)
+            timings.append(time.monotonic() - started)
+        print(f"   {backend:<8} median {statistics.median(timings):6.2f}s  {client.stats['requests']} requests")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("project")
+    parser.add_argument("repo_id")
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--author", default=None)
+    parser.add_argument("--parallel", type=int, default=16)
+    args = parser.parse_args()
+
+    from_date = datetime.now() - timedelta(days=args.days)
+    bench_azure(args.project, args.repo_id, from_date, args.runs, args.author)
+    bench_backends(args.project, args.repo_id, from_date, args.runs, args.parallel, args.author)
+
+
+if __name__ == "__main__":
+    main()
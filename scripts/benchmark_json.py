@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Микро-бенчмарк разбора JSON-страниц коммитов
+Сравнивает json (stdlib), orjson (если установлен) и потоковый разбор на страницах Azure DevOps и GitHub
+
+    python scripts/benchmark_json.py [page.json ...] [--runs 5]
+
+Без аргументов использует синтетические страницы в формате API. Записанную страницу можно сохранить так:
+    curl -u :$AZURE_DEVOPS_PAT "https://dev.azure.com/<org>/<project>/_apis/git/repositories/<id>/commits?api-version=7.0&\\$top=10000" > azure.json
+    curl -H "Authorization: Bearer $GITHUB_TOKEN" "https://api.github.com/repos/<owner>/<repo>/commits?per_page=100" > github.json
+"""
+
+import argparse
+import codecs
+import json
+import statistics
+import time
+
+import generate_heatmap as gh
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def synthetic_azure_page(count: int = 10000) -> bytes:
+    commits = [{
+        "commitId": f"{i:040x}",
+        "author": {"name": "Dev", "email": "dev@example.com", "date": "2026-01-01T12:00:00Z"},
+        "committer": {"name": "Dev", "email": "dev@example.com", "date": "2026-01-01T12:00:00Z"},
+        "comment": "Fix things in the module and update tests accordingly",
+        "changeCounts": {"Add": 1, "Edit": 3, "Delete": 0},
+        "url": f"https://dev.azure.com/org/project/_apis/git/repositories/repo/commits/{i:040x}",
+        "remoteUrl": f"https://dev.azure.com/org/project/_git/repo/commit/{i:040x}",
+    } for i in range(count)]
+    return json.dumps({"count": count, "value": commits}).encode()
+
+
+def synthetic_github_page(count: int = 100) -> bytes:
+    user = {"login": "dev", "id": 1, "type": "User", "site_admin": False,
+            "avatar_url": "https://avatars.githubusercontent.com/u/1?v=4", "url": "https://api.github.com/users/dev"}
+    commits = [{
+        "sha": f"{i:040x}",
+        "node_id": "C_kwDOAAAB",
+        "commit": {
+            "author": {"name": "Dev", "email": "dev@example.com", "date": "2026-01-01T12:00:00Z"},
+            "committer": {"name": "Dev", "email": "dev@example.com", "date": "2026-01-01T12:00:00Z"},
+            "message": "Fix things in the module and update tests accordingly",
+            "tree": {"sha": f"{i:040x}", "url": "https://api.github.com/repos/o/r/git/trees/x"},
+            "comment_count": 0,
+            "verification": {"verified": False, "reason": "unsigned", "signature": None, "payload": None},
+        },
+        "url": f"https://api.github.com/repos/o/r/commits/{i:040x}",
+        "author": user,
+        "committer": user,
+        "parents": [{"sha": f"{i + 1:040x}", "url": "https://api.github.com/repos/o/r/commits/x"}],
+    } for i in range(count)]
+    return json.dumps(commits).encode()
+
+
+def text_chunks(data: bytes, size: int = 1 << 16):
+    """Байты кусками текста, как их отдаёт iter_text при потоковом чтении ответа"""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    for i in range(0, len(data), size):
+        yield decoder.decode(data[i:i + size])
+    yield decoder.decode(b"", final=True)
+
+
+def decoders() -> dict:
+    result = {"json": json.loads}
+    if orjson is not None:
+        result["orjson"] = orjson.loads
+    # Потоковый разбор тем же кодом, что и AZURE_STREAM_JSON (кусками по 64 КБ)
+    result["stream"] = lambda data: list(gh.iter_json_array(
+        text_chunks(data), key="value" if data.lstrip().startswith(b"{") else None,
+    ))
+    return result
+
+
+def bench(name: str, data: bytes, runs: int):
+    size_mb = len(data) / 1e6
+    print(f"{name}: {size_mb:.2f} MB")
+    for decoder_name, loads in decoders().items():
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            loads(data)
+            timings.append(time.perf_counter() - started)
+        median = statistics.median(timings)
+        print(f"   {decoder_name:<7} {median * 1000:8.1f} ms  {size_mb / median:7.1f} MB/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pages", nargs="*", help="recorded API responses (JSON files)")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    if not orjson:
+        print("orjson is not installed (pip install orjson): comparing stdlib decoders only\n")
+
+    if args.pages:
+        for path in args.pages:
+            with open(path, "rb") as f:
+                bench(path, f.read(), args.runs)
+    else:
+        bench("Azure DevOps page (synthetic, 10000 commits)", synthetic_azure_page(), args.runs)
+        bench("GitHub page (synthetic, 100 commits)", synthetic_github_page(), args.runs)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,9 +7,35 @@ GitHub + Azure DevOps Commits Heatmap Generator
 import os
 import sys
 import requests
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlencode
 from datetime import datetime, timedelta
-from collections import defaultdict
+from collections import Counter, defaultdict, deque
+from functools import lru_cache
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import asyncio
 import base64
+import codecs
+import json
+import math
+import random
+import threading
+import time
+
+try:
+    import aiohttp  # опционально: нужен только для FETCH_ENGINE=async
+except ImportError:
+    aiohttp = None
+
+try:
+    import orjson  # опционально: быстрый разбор JSON
+except ImportError:
+    orjson = None
+
+try:
+    import httpx  # опционально: нужен только для HTTP_BACKEND=http2 (вместе с пакетом h2)
+except ImportError:
+    httpx = None
 
 
 # === КОНФИГУРАЦИЯ ===
@@ -25,6 +51,82 @@ GITHUB_USERNAME = os.environ.get("GH_USERNAME", "")
 AUTHOR_EMAILS = [e.strip().lower() for e in os.environ.get("AUTHOR_EMAILS", "").split(",") if e.strip()]
 OUTPUT_FILE = os.environ.get("OUTPUT_FILE", "commits-heatmap.svg")
 
+# HTTP: размер пула keep-alive соединений на хост
+AZURE_POOL_SIZE = int(os.environ.get("AZURE_POOL_SIZE", "10"))
+GITHUB_POOL_SIZE = int(os.environ.get("GITHUB_POOL_SIZE", "10"))
+# Сколько репозиториев обрабатывать одновременно (и лимит запросов в полёте) на хост; 1 = последовательно
+AZURE_CONCURRENCY = int(os.environ.get("AZURE_CONCURRENCY", "8"))
+GITHUB_CONCURRENCY = int(os.environ.get("GITHUB_CONCURRENCY", "8"))
+# Файл кэша условных запросов (ETag / Last-Modified); пусто = кэш выключен
+HTTP_CACHE_FILE = os.environ.get("HTTP_CACHE_FILE", "")
+# Транспорт синхронного движка: requests (HTTP/1.1, пул соединений) или http2 (httpx, мультиплексирование)
+HTTP_BACKEND = os.environ.get("HTTP_BACKEND", "requests").lower()
+HTTP2_CONNECTIONS = int(os.environ.get("HTTP2_CONNECTIONS", "2"))
+# Разбор JSON-ответов: auto (orjson, если установлен) или json (только стандартная библиотека)
+JSON_DECODER = os.environ.get("JSON_DECODER", "auto").lower()
+# Лимиты запросов (X-RateLimit-*, Retry-After): сколько запросов бюджета не трогать
+# и при какой доле остатка начинать равномерно растягивать запросы до сброса
+RATE_LIMIT_RESERVE = int(os.environ.get("RATE_LIMIT_RESERVE", "10"))
+RATE_LIMIT_PACE_BELOW = float(os.environ.get("RATE_LIMIT_PACE_BELOW", "0.2"))
+# Повторы идемпотентных запросов: число попыток, базовая задержка и общий лимит времени на повторы (сек)
+HTTP_MAX_RETRIES = int(os.environ.get("HTTP_MAX_RETRIES", "5"))
+HTTP_RETRY_BASE_DELAY = float(os.environ.get("HTTP_RETRY_BASE_DELAY", "1"))
+HTTP_RETRY_MAX_TIME = float(os.environ.get("HTTP_RETRY_MAX_TIME", "120"))
+RETRY_STATUSES = {429, 502, 503, 504}
+# Таймауты соединения и чтения одного запроса (сек) и общий дедлайн фазы загрузки (сек, 0 = без дедлайна)
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", "10"))
+HTTP_READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", "60"))
+FETCH_DEADLINE = float(os.environ.get("FETCH_DEADLINE", "0"))
+# Хеджирование страниц коммитов: если ответ дольше HEDGE_PERCENTILE-го перцентиля задержек хоста,
+# отправляем дубликат и берём первый ответ. Дубликатов не больше HEDGE_BUDGET от числа запросов
+HEDGE_REQUESTS = os.environ.get("HEDGE_REQUESTS", "0") == "1"
+HEDGE_PERCENTILE = float(os.environ.get("HEDGE_PERCENTILE", "95"))
+HEDGE_BUDGET = float(os.environ.get("HEDGE_BUDGET", "0.05"))
+HEDGE_MIN_SAMPLES = int(os.environ.get("HEDGE_MIN_SAMPLES", "20"))
+# Предохранители: после стольких неудач подряд оставшаяся работа по ключу пропускается.
+# Ключи — хост (неудача: обрыв соединения или таймаут после всех повторов)
+# и проект Azure / владелец на GitHub (неудача: ошибка репозитория, в том числе 5xx).
+# Разомкнутые предохранители сохраняются в STATE_FILE; в следующем запуске первая попытка пробная
+BREAKER_HOST_THRESHOLD = int(os.environ.get("BREAKER_HOST_THRESHOLD", "10"))
+BREAKER_SCOPE_THRESHOLD = int(os.environ.get("BREAKER_SCOPE_THRESHOLD", "3"))
+# Файл состояния между запусками (головы веток и коммиты по репозиториям); пусто = выключено
+STATE_FILE = os.environ.get("STATE_FILE", "")
+# Инкрементальная загрузка: по репозиторию только с отметки прошлой загрузки (минус перекрытие, часы)
+INCREMENTAL = os.environ.get("INCREMENTAL", "0") == "1"
+INCREMENTAL_OVERLAP_HOURS = float(os.environ.get("INCREMENTAL_OVERLAP_HOURS", "48"))
+# Раз в столько дней репозиторий загружается целиком: коммиты, влитые позже перекрытия, несут старые даты
+INCREMENTAL_FULL_DAYS = float(os.environ.get("INCREMENTAL_FULL_DAYS", "7"))
+# Движок загрузки: sync (requests + пул потоков) или async (aiohttp, один поток)
+FETCH_ENGINE = os.environ.get("FETCH_ENGINE", "sync").lower()
+# Для async: сколько запросов в полёте на хост
+ASYNC_CONCURRENCY = int(os.environ.get("ASYNC_CONCURRENCY", "100"))
+
+# GitHub: rest (репозитории + история коммитов), calendar (contributionCalendar одним GraphQL-запросом)
+# graphql (история многих репозиториев в одном GraphQL-запросе) или search (поиск коммитов по автору)
+GITHUB_BACKEND = os.environ.get("GITHUB_BACKEND", "rest").lower()
+# Для graphql: сколько репозиториев в одном запросе
+GITHUB_GRAPHQL_BATCH = int(os.environ.get("GITHUB_GRAPHQL_BATCH", "25"))
+
+# Azure DevOps: фильтровать по автору на сервере (searchCriteria.author) — по запросу на каждый email
+AZURE_SERVER_AUTHOR_FILTER = os.environ.get("AZURE_SERVER_AUTHOR_FILTER", "1") != "0"
+# Azure DevOps: API истории коммитов — get (GET .../commits) или batch (POST .../commitsbatch)
+AZURE_COMMITS_API = os.environ.get("AZURE_COMMITS_API", "get").lower()
+# Azure DevOps: пагинация — skip ($skip) или cursor (сужаем toDate до самого старого коммита страницы)
+AZURE_PAGINATION = os.environ.get("AZURE_PAGINATION", "skip").lower()
+AZURE_PAGE_SIZE = 10000
+# Azure DevOps: разбирать страницы коммитов потоково, по одному коммиту, не держа в памяти всю страницу
+AZURE_STREAM_JSON = os.environ.get("AZURE_STREAM_JSON", "0") == "1"
+
+# Шардирование по датам внутри репозитория: окна from_date..сейчас загружаются параллельно.
+# SHARD_REPOS — список "project/repo" или "owner/repo"; пусто = все репозитории
+SHARD_WINDOWS = int(os.environ.get("SHARD_WINDOWS", "1"))
+SHARD_REPOS = {r.strip().lower() for r in os.environ.get("SHARD_REPOS", "").split(",") if r.strip()}
+
+# Пропускать репозитории, в которых по метаданным не может быть коммитов за период
+PRUNE_REPOS = os.environ.get("PRUNE_REPOS", "1") != "0"
+# Azure DevOps: пропускать и проекты с lastUpdateTime до начала периода (lastUpdateTime не всегда двигается от пушей)
+AZURE_PRUNE_STALE_PROJECTS = os.environ.get("AZURE_PRUNE_STALE_PROJECTS", "0") == "1"
+
 # Цвета для heatmap (зелёно-фиолетовый градиент)
 COLORS = {
     0: "#161b22",   # нет коммитов
@@ -35,6 +137,896 @@ COLORS = {
 }
 
 
+# === HTTP ===
+
+def loads_json(data: bytes | str):
+    """Разобрать JSON быстрым декодером, если он доступен, иначе стандартным"""
+    if orjson is not None and JSON_DECODER != "json":
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def decode_json(response):
+    """Тело ответа как JSON; вместо response.json(), чтобы работал быстрый декодер"""
+    return loads_json(response.content)
+
+
+class CachedResponse:
+    """Ответ, восстановленный из кэша после 304 Not Modified"""
+
+    def __init__(self, url: str, body: str):
+        self.url = url
+        self.status_code = 200
+        self.ok = True
+        self.headers = {}
+        self.text = body
+        self.content = body.encode()
+
+    def json(self):
+        return loads_json(self.content)
+
+    def raise_for_status(self):
+        pass
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class HttpCache:
+    """Валидаторы (ETag / Last-Modified) и тела GET-ответов между запусками"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries = {}
+        self.used = set()
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+
+    @staticmethod
+    def key(url: str, params: dict = None) -> str:
+        return f"{url}?{urlencode(sorted(params.items()))}" if params else url
+
+    def validators(self, key: str) -> dict:
+        with self._lock:
+            entry = self.entries.get(key)
+        if not entry:
+            return {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def load(self, key: str, url: str) -> CachedResponse:
+        with self._lock:
+            self.used.add(key)
+            return CachedResponse(url, self.entries[key]["body"])
+
+    def store(self, key: str, response: requests.Response):
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return
+        with self._lock:
+            self.used.add(key)
+            self.entries[key] = {"etag": etag, "last_modified": last_modified, "body": response.text}
+
+    def save(self):
+        """Записать на диск только записи, использованные в этом запуске"""
+        if not self.path:
+            return
+        with self._lock:
+            entries = {key: self.entries[key] for key in self.used if key in self.entries}
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(entries, f)
+
+
+HTTP_CACHE = HttpCache(HTTP_CACHE_FILE)
+
+
+class DeadlineExceeded(Exception):
+    """Истёк общий дедлайн загрузки; partial — коммиты, собранные до этого"""
+
+    def __init__(self, partial: list[dict] = None):
+        super().__init__("fetch deadline exceeded")
+        self.partial = partial or []
+
+
+_deadline_at = None
+INCOMPLETE_REPOS = []  # репозитории, загрузку которых прервал дедлайн
+
+
+def start_deadline():
+    global _deadline_at
+    _deadline_at = time.monotonic() + FETCH_DEADLINE if FETCH_DEADLINE > 0 else None
+
+
+def deadline_remaining() -> float | None:
+    """Сколько секунд осталось до дедлайна; None — дедлайна нет"""
+    return None if _deadline_at is None else _deadline_at - time.monotonic()
+
+
+def mark_incomplete(repo_full_name: str):
+    INCOMPLETE_REPOS.append(repo_full_name)
+
+
+class CircuitOpen(Exception):
+    """Предохранитель ключа разомкнут: запрос не отправлялся"""
+
+
+class CircuitBreakers:
+    """Предохранители по ключам: closed — работаем, open — пропускаем, half_open — следующая попытка пробная.
+
+    Пока идёт пробная попытка (trial), остальные вызовы по ключу ждут её исхода.
+    """
+
+    def __init__(self):
+        self.states = {}
+        self._cond = threading.Condition()
+
+    def restore(self, saved: dict):
+        """Разомкнутые в прошлом запуске предохранители — в half_open"""
+        with self._cond:
+            for key, entry in saved.items():
+                self.states[key] = {"state": "half_open", "failures": 0, "reason": entry["reason"],
+                                    "since": entry["since"]}
+
+    def snapshot(self) -> dict:
+        """Незамкнутые предохранители для STATE_FILE"""
+        with self._cond:
+            return {key: {"reason": s["reason"], "since": s["since"]}
+                    for key, s in self.states.items() if s["state"] != "closed"}
+
+    def enter(self, key: str) -> bool:
+        """Можно ли работать по ключу; True — это пробная попытка. Разомкнут — CircuitOpen(причина)"""
+        with self._cond:
+            while True:
+                state = self.states.get(key)
+                if state is None or state["state"] == "closed":
+                    return False
+                if state["state"] == "open":
+                    raise CircuitOpen(state["reason"])
+                if state["state"] == "half_open":
+                    state["state"] = "trial"
+                    return True
+                self._cond.wait()
+
+    def success(self, key: str):
+        with self._cond:
+            state = self.states.get(key)
+            if state and state["state"] in ("closed", "trial"):
+                del self.states[key]
+                self._cond.notify_all()
+
+    def failure(self, key: str, reason: str, threshold: int):
+        with self._cond:
+            state = self.states.setdefault(key, {"state": "closed", "failures": 0})
+            if state["state"] == "open":
+                return
+            state["failures"] += 1
+            if state["state"] == "trial":
+                # Пробная попытка не удалась: снова разомкнут, с прежним временем первого срабатывания
+                state.update(state="open", reason=f"{reason} (failing since {state['since']})")
+                self._cond.notify_all()
+            elif state["failures"] >= threshold:
+                state.update(state="open", reason=f"{reason} ({state['failures']} consecutive failures)",
+                             since=datetime.now().replace(microsecond=0).isoformat())
+                self._cond.notify_all()
+
+    def closed(self, key: str) -> bool:
+        """Предохранитель ключа замкнут (работаем без ограничений)"""
+        with self._cond:
+            state = self.states.get(key)
+            return state is None or state["state"] == "closed"
+
+    def abandon(self, key: str, trial: bool):
+        """Попытка прервана без исхода (дедлайн): пробную отдаём следующему"""
+        if not trial:
+            return
+        with self._cond:
+            state = self.states.get(key)
+            if state and state["state"] == "trial":
+                state["state"] = "half_open"
+                self._cond.notify_all()
+
+
+BREAKERS = CircuitBreakers()
+SKIPPED_REPOS = {}  # репозиторий -> причина: ошибка или разомкнутый предохранитель
+
+
+def describe_error(error: Exception) -> str:
+    response = getattr(error, "response", None)
+    if isinstance(error, requests.HTTPError) and response is not None:
+        return f"HTTP {response.status_code}"
+    return f"{type(error).__name__}: {error}"
+
+
+def fetch_guarded(scope: str, repo_full_name: str, fetch) -> list[dict]:
+    """fetch() репозитория под предохранителем scope; ошибка репозитория не прерывает остальные"""
+    try:
+        trial = BREAKERS.enter(scope)
+    except CircuitOpen as e:
+        SKIPPED_REPOS[repo_full_name] = f"circuit open for {scope}: {e}"
+        return []
+    try:
+        commits = fetch()
+    except DeadlineExceeded as e:
+        BREAKERS.abandon(scope, trial)
+        mark_incomplete(repo_full_name)
+        return e.partial
+    except CircuitOpen as e:
+        # Разомкнут предохранитель хоста — проект не виноват
+        BREAKERS.abandon(scope, trial)
+        SKIPPED_REPOS[repo_full_name] = f"circuit open: {e}"
+        return []
+    except Exception as e:
+        BREAKERS.failure(scope, describe_error(e), BREAKER_SCOPE_THRESHOLD)
+        SKIPPED_REPOS[repo_full_name] = describe_error(e)
+        return []
+    BREAKERS.success(scope)
+    return commits
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Retry-After в секундах (форма с HTTP-датой не используется Azure DevOps и GitHub)"""
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+class RateLimiter:
+    """Бюджет одной группы лимитов по заголовкам X-RateLimit-*: параллелизм и темп подстраиваются под остаток"""
+
+    def __init__(self):
+        self.limit = None
+        self.remaining = None
+        self.reset_at = 0.0
+        self.blocked_until = 0.0
+        self.next_slot = 0.0
+        self.in_flight = 0
+        self._cond = threading.Condition()
+
+    def _delay(self, now: float) -> float | None:
+        """Сколько ждать перед запросом: 0 — можно сейчас, None — до завершения запроса в полёте"""
+        if self.blocked_until > now:
+            return self.blocked_until - now
+        if self.remaining is None or self.reset_at <= now:
+            return 0
+        # Запросы в полёте уже потратили бюджет, хотя сервер этого ещё не сообщил
+        budget = self.remaining - self.in_flight - RATE_LIMIT_RESERVE
+        if budget <= 0:
+            return None if self.in_flight else self.reset_at - now
+        if self._pacing() and self.next_slot > now:
+            return self.next_slot - now
+        return 0
+
+    def _pacing(self) -> bool:
+        return bool(self.limit) and self.remaining < self.limit * RATE_LIMIT_PACE_BELOW
+
+    def acquire(self, max_wait: float = None) -> float:
+        """Дождаться разрешения на запрос; возвращает время ожидания в секундах"""
+        started = time.monotonic()
+        with self._cond:
+            while (delay := self._delay(time.time())) != 0:
+                if max_wait is not None:
+                    left = max_wait - (time.monotonic() - started)
+                    if left <= 0 or (delay is not None and delay > left):
+                        raise DeadlineExceeded()
+                    delay = left if delay is None else delay
+                self._cond.wait(timeout=delay)
+            self.in_flight += 1
+            if self.remaining is not None and self._pacing():
+                now = time.time()
+                budget = max(1, self.remaining - self.in_flight - RATE_LIMIT_RESERVE)
+                self.next_slot = max(now, self.next_slot) + (self.reset_at - now) / budget
+        return time.monotonic() - started
+
+    def release(self, status: int | None, headers) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            self._update(status, headers)
+            self._cond.notify_all()
+
+    def _update(self, status: int | None, headers) -> None:
+        now = time.time()
+        remaining = headers.get("X-RateLimit-Remaining")
+        if remaining is not None:
+            reset_at = float(headers.get("X-RateLimit-Reset") or 0)
+            # Ответы приходят не по порядку: в пределах одного окна верим наименьшему остатку
+            if reset_at == self.reset_at and self.remaining is not None:
+                self.remaining = min(self.remaining, int(float(remaining)))
+            else:
+                self.remaining = int(float(remaining))
+                self.reset_at = reset_at
+            limit = headers.get("X-RateLimit-Limit")
+            self.limit = int(float(limit)) if limit else self.limit
+
+        retry_after = parse_retry_after(headers.get("Retry-After"))
+        if retry_after is not None:
+            self.blocked_until = max(self.blocked_until, now + retry_after)
+        elif status in (403, 429) and self.remaining == 0:
+            self.blocked_until = max(self.blocked_until, self.reset_at)
+
+
+def rate_limit_bucket(url: str) -> str:
+    """Группа лимитов запроса: у GitHub search и GraphQL отдельные бюджеты"""
+    if "/search/" in url:
+        return "search"
+    if url.endswith("/graphql"):
+        return "graphql"
+    return "core"
+
+
+HTTP_CLIENTS = []  # созданные клиенты — для итоговой статистики
+
+
+class Http2Response:
+    """Ответ httpx с интерфейсом requests.Response, который использует HttpClient"""
+
+    def __init__(self, response: "httpx.Response"):
+        self._response = response
+        self.url = str(response.url)
+        self.status_code = response.status_code
+        self.ok = response.is_success
+        self.headers = response.headers
+
+    @property
+    def content(self) -> bytes:
+        return self._response.read()
+
+    @property
+    def text(self) -> str:
+        self._response.read()
+        return self._response.text
+
+    def json(self):
+        return loads_json(self.content)
+
+    def iter_content(self, chunk_size: int = None):
+        return self._response.iter_bytes(chunk_size)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+    def close(self):
+        self._response.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Http2Session:
+    """Транспорт HTTP/2 на httpx: запросы к хосту мультиплексируются в нескольких соединениях"""
+
+    def __init__(self, headers: dict, max_connections: int):
+        if httpx is None:
+            raise RuntimeError("HTTP_BACKEND=http2 requires httpx with HTTP/2 support (pip install 'httpx[http2]')")
+        limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.client = httpx.Client(http2=True, headers=headers, limits=limits)
+
+    def request(self, method: str, url: str, params: dict = None, json: dict = None, headers: dict = None,
+                timeout: tuple = None, stream: bool = False) -> Http2Response:
+        connect_timeout, read_timeout = timeout
+        request = self.client.build_request(
+            method, url, params=params, json=json, headers=headers,
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+        )
+        return Http2Response(self.client.send(request, stream=stream))
+
+
+# Ошибки транспорта, после которых запрос можно повторить
+TRANSIENT_ERRORS = (requests.ConnectionError, requests.Timeout) + ((httpx.TransportError,) if httpx else ())
+
+
+class HttpClient:
+    """Клиент одного хоста: пул keep-alive соединений и заголовки, вычисленные один раз"""
+
+    def __init__(self, name: str, base_url: str, headers: dict, pool_size: int, max_concurrency: int):
+        self.name = name
+        self.base_url = base_url
+        self.max_concurrency = max(1, max_concurrency)
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        if HTTP_BACKEND == "http2":
+            # Потоки HTTP/2 мультиплексируются, много соединений не нужно
+            self.session = Http2Session(headers, HTTP2_CONNECTIONS)
+        else:
+            self.session = requests.Session()
+            self.session.headers.update(headers)
+            # pool_block: при нехватке соединений ждём свободное, а не открываем одноразовое
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+            self.session.mount(base_url, adapter)
+        self.stats = Counter()
+        self._stats_lock = threading.Lock()
+        self.limiters = defaultdict(RateLimiter)
+        # Задержки последних хеджируемых запросов — по ним считается порог хеджирования
+        self.latencies = deque(maxlen=500)
+        self._hedge_pool = self._duplicate_pool = None
+        HTTP_CLIENTS.append(self)
+
+    def count(self, key: str, n: int = 1):
+        with self._stats_lock:
+            self.stats[key] += n
+
+    def request(self, method: str, url: str, idempotent: bool = None, hedge: bool = False, cache: bool = True,
+                **kwargs) -> requests.Response:
+        """Запрос с кэшем, лимитами и повторами; idempotent — разрешить повторы не-GET (read-only POST),
+        hedge — разрешить дубликат медленного запроса (см. HEDGE_REQUESTS), cache — использовать HTTP_CACHE"""
+        # Условный GET: при 304 отдаём тело из кэша
+        # Потоковые ответы не буферизуются, поэтому не кэшируются
+        cacheable = cache and method == "GET" and HTTP_CACHE.path and not kwargs.get("stream")
+        cache_key = HttpCache.key(url, kwargs.get("params")) if cacheable else None
+        validators = HTTP_CACHE.validators(cache_key) if cache_key else {}
+        if validators:
+            kwargs["headers"] = {**kwargs.get("headers", {}), **validators}
+
+        retryable = method == "GET" if idempotent is None else idempotent
+        send = self._send_hedged if hedge and retryable and HEDGE_REQUESTS else self._send
+        try:
+            trial = BREAKERS.enter(self.name)
+        except CircuitOpen as e:
+            raise CircuitOpen(f"{self.name}: {e}")
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            try:
+                response = send(method, url, **kwargs)
+                if response.status_code not in RETRY_STATUSES and not (
+                        response.status_code == 403 and "Retry-After" in response.headers):
+                    break
+                error = None
+            except TRANSIENT_ERRORS as e:
+                response, error = None, e
+            except Exception:
+                # Дедлайн и прочие ошибки — не про здоровье хоста
+                BREAKERS.abandon(self.name, trial)
+                raise
+
+            delay = self._retry_delay(attempt, response)
+            left = deadline_remaining()
+            if (not retryable or attempt >= HTTP_MAX_RETRIES or time.monotonic() - started + delay > HTTP_RETRY_MAX_TIME
+                    or (left is not None and delay >= left)):
+                if error:
+                    BREAKERS.failure(self.name, type(error).__name__, BREAKER_HOST_THRESHOLD)
+                    raise error
+                break
+            if response is not None:
+                # Отброшенный ответ (в том числе потоковый) возвращает соединение в пул
+                response.close()
+            attempt += 1
+            self.count("retries")
+            time.sleep(delay)
+
+        # Хост ответил — он доступен; 5xx отдельного проекта считает предохранитель проекта, а не хоста
+        BREAKERS.success(self.name)
+
+        if validators and response.status_code == 304:
+            self.count("not_modified")
+            return HTTP_CACHE.load(cache_key, url)
+        if cache_key and response.status_code == 200:
+            HTTP_CACHE.store(cache_key, response)
+        return response
+
+    def _send(self, method: str, url: str, on_slot=None, slot_held: bool = False, **kwargs) -> requests.Response:
+        """Одна попытка: ждём бюджет лимита и слот хоста; таймауты не выходят за дедлайн.
+
+        on_slot() вызывается, когда запрос занял слот; slot_held — слот уже занят вызывающим.
+        """
+        try:
+            left = deadline_remaining()
+            if left is not None and left <= 0:
+                raise DeadlineExceeded()
+            with self._stats_lock:
+                limiter = self.limiters[rate_limit_bucket(url)]
+            waited = limiter.acquire(max_wait=left)
+            if waited:
+                self.count("throttled_seconds", waited)
+
+            connect_timeout, read_timeout = HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT
+            left = deadline_remaining()
+            if left is not None:
+                if left <= 0:
+                    limiter.release(None, {})
+                    raise DeadlineExceeded()
+                connect_timeout, read_timeout = min(connect_timeout, left), min(read_timeout, left)
+
+            response = None
+            try:
+                if not slot_held:
+                    self._slots.acquire()
+                    slot_held = True
+                self.count("requests")
+                if on_slot:
+                    on_slot()
+                response = self.session.request(method, url, timeout=(connect_timeout, read_timeout), **kwargs)
+            finally:
+                limiter.release(response.status_code if response is not None else None,
+                                response.headers if response is not None else {})
+            return response
+        finally:
+            if slot_held:
+                self._slots.release()
+
+    def _send_hedged(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Попытка с хеджированием: если ответа нет дольше порога, параллельно отправляем дубликат"""
+        threshold = self._hedge_threshold()
+        if threshold is None:
+            return self._timed_send(method, url, **kwargs)
+
+        with self._stats_lock:
+            if self._hedge_pool is None:
+                # Потоки только ждут ответа; реальную параллельность по-прежнему ограничивает _slots.
+                # Дубликаты — в своём пуле: каждый уже держит слот, поэтому в очередь они не встают
+                self._hedge_pool = ThreadPoolExecutor(max_workers=4 * self.max_concurrency)
+                self._duplicate_pool = ThreadPoolExecutor(max_workers=self.max_concurrency)
+        in_flight = threading.Event()
+        primary = self._hedge_pool.submit(self._timed_send, method, url, on_slot=in_flight.set, **kwargs)
+        primary.add_done_callback(lambda _: in_flight.set())
+        # Порог отсчитываем с момента, когда запрос занял слот: ожидание лимита и слота — не медленный сервер
+        in_flight.wait()
+        done, _ = wait([primary], timeout=threshold)
+        if done:
+            return primary.result()
+        # Дубликат — только в свободный слот: в очереди за теми же слотами он не ускорит ответ
+        if not self._slots.acquire(blocking=False):
+            return primary.result()
+        if not self._take_hedge():
+            self._slots.release()
+            return primary.result()
+
+        duplicate = self._duplicate_pool.submit(self._timed_send, method, url, slot_held=True, **kwargs)
+        pending = {primary, duplicate}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    error = error or future.exception()
+                    continue
+                # Проигравший ответ закрываем, когда он придёт, чтобы вернуть соединение в пул
+                for loser in pending:
+                    loser.add_done_callback(close_response)
+                for other in done - {future}:
+                    close_response(other)
+                if future is duplicate:
+                    self.count("hedge_wins")
+                return future.result()
+        raise error
+
+    def _timed_send(self, method: str, url: str, on_slot=None, **kwargs) -> requests.Response:
+        """Попытка с замером задержки сервера: от занятия слота до ответа"""
+        sent = []
+
+        def slot_taken():
+            sent.append(time.monotonic())
+            if on_slot:
+                on_slot()
+
+        response = self._send(method, url, on_slot=slot_taken, **kwargs)
+        if response.status_code < 500 and sent:
+            with self._stats_lock:
+                self.latencies.append(time.monotonic() - sent[0])
+        return response
+
+    def _hedge_threshold(self) -> float | None:
+        """Перцентиль HEDGE_PERCENTILE задержек хоста; None, пока замеров мало"""
+        with self._stats_lock:
+            if len(self.latencies) < HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * HEDGE_PERCENTILE / 100))]
+
+    def _take_hedge(self) -> bool:
+        """Списать дубликат из бюджета: не больше HEDGE_BUDGET от всех запросов хоста"""
+        with self._stats_lock:
+            if self.stats["hedged"] + 1 > HEDGE_BUDGET * self.stats["requests"]:
+                return False
+            self.stats["hedged"] += 1
+            return True
+
+    @staticmethod
+    def _retry_delay(attempt: int, response: requests.Response | None) -> float:
+        """Retry-After, если сервер его прислал, иначе экспоненциальная задержка с полным джиттером"""
+        retry_after = parse_retry_after(response.headers.get("Retry-After")) if response is not None else None
+        if retry_after is not None:
+            return retry_after
+        return random.uniform(0, HTTP_RETRY_BASE_DELAY * 2 ** attempt)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+
+def close_response(future):
+    """Закрыть ответ завершившейся попытки, если она не упала"""
+    if future.exception() is None:
+        future.result().close()
+
+
+def run_parallel(func, items: list, workers: int) -> list:
+    """Применить func к каждому элементу пулом потоков; результаты в порядке items"""
+    if workers <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(workers, len(items))) as executor:
+        return list(executor.map(func, items))
+
+
+def iter_text(response: requests.Response, chunk_size: int = 1 << 16):
+    """Тело ответа кусками текста UTF-8 по мере получения"""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    for chunk in response.iter_content(chunk_size):
+        yield decoder.decode(chunk)
+    yield decoder.decode(b"", final=True)
+
+
+def iter_json_array(chunks, key: str = None):
+    """Элементы JSON-массива по мере поступления текста.
+
+    Массив — весь документ или, если задан key, поле key объекта верхнего уровня.
+    В памяти держится только ещё не разобранный хвост текста и текущий элемент.
+    """
+    decoder = json.JSONDecoder()
+    chunks = iter(chunks)
+    buf = ""
+    pos = 0
+    eof = False
+
+    def more() -> bool:
+        nonlocal buf, pos, eof
+        for chunk in chunks:
+            if chunk:
+                buf = buf[pos:] + chunk
+                pos = 0
+                return True
+        eof = True
+        return False
+
+    def peek() -> str:
+        """Следующий значимый символ; пустая строка — конец данных"""
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n":
+                pos += 1
+            if pos < len(buf):
+                return buf[pos]
+            if not more():
+                return ""
+
+    def value():
+        """Следующее значение целиком, дочитывая данные, пока оно не закончится"""
+        nonlocal pos
+        while True:
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+                # Число на краю буфера ("1", "1.", "1e") может продолжиться в следующем куске
+                number = isinstance(obj, (int, float)) and not isinstance(obj, bool)
+                if eof or not (number and buf[end:].strip("0123456789.eE+-") == ""):
+                    pos = end
+                    return obj
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            more()
+
+    def expect(char: str):
+        nonlocal pos
+        if peek() != char:
+            raise ValueError(f"Malformed JSON: expected {char!r}")
+        pos += 1
+
+    if key is not None:
+        expect("{")
+        while True:
+            if peek() in ("}", ""):
+                return
+            name = value()
+            expect(":")
+            peek()
+            if name == key:
+                break
+            value()
+            if peek() == ",":
+                pos += 1
+
+    expect("[")
+    if peek() == "]":
+        return
+    while True:
+        peek()
+        yield value()
+        char = peek()
+        pos += 1
+        if char == "]":
+            return
+        if char != ",":
+            raise ValueError("Malformed JSON: expected ',' or ']'")
+
+
+def merge_unique(batches: list[list[dict]], key) -> list[dict]:
+    """Склеить списки, убрав дубликаты по key(item); порядок первого появления сохраняется"""
+    seen = set()
+    merged = []
+    for batch in batches:
+        for item in batch:
+            item_key = key(item)
+            if item_key not in seen:
+                seen.add(item_key)
+                merged.append(item)
+    return merged
+
+
+def merge_query_results(run, queries: list, key) -> list[dict]:
+    """Выполнить запросы параллельно и склеить без дубликатов; при дедлайне — DeadlineExceeded с частичным итогом"""
+
+    def guarded(query) -> tuple[list[dict], bool]:
+        try:
+            return run(query), False
+        except DeadlineExceeded as e:
+            return e.partial, True
+
+    results = run_parallel(guarded, queries, len(queries))
+    merged = merge_unique([commits for commits, _ in results], key)
+    if any(timed_out for _, timed_out in results):
+        raise DeadlineExceeded(merged)
+    return merged
+
+
+_log_buffer = threading.local()
+_print_lock = threading.Lock()
+
+
+def log(line: str):
+    """Строка вывода источника: копится в буфере потока источника (см. fetch_all_sources), иначе сразу печатается"""
+    lines = getattr(_log_buffer, "lines", None)
+    if lines is None:
+        print(line)
+    else:
+        lines.append(line)
+
+
+def print_pruned(pruned: int, saved_requests: int):
+    if pruned:
+        log(f"   ✂️  Pruned {pruned} repositories without activity in the period (≥{saved_requests} requests saved)")
+
+
+def shard_count(repo_full_name: str) -> int:
+    """Сколько окон по датам использовать для репозитория"""
+    if SHARD_REPOS and repo_full_name.lower() not in SHARD_REPOS:
+        return 1
+    return max(1, SHARD_WINDOWS)
+
+
+def date_windows(from_date: datetime, count: int) -> list[tuple[datetime, datetime | None]]:
+    """Разбить from_date..сейчас на count соседних окон; последнее открыто справа"""
+    if count <= 1:
+        return [(from_date, None)]
+    step = (datetime.now() - from_date) / count
+    bounds = [from_date + step * i for i in range(count)]
+    return list(zip(bounds, bounds[1:] + [None]))
+
+
+# === СОСТОЯНИЕ МЕЖДУ ЗАПУСКАМИ ===
+
+class FetchState:
+    """По репозиторию: голова ветки по умолчанию на момент загрузки и найденные коммиты (в сокращённом виде)"""
+
+    def __init__(self, path: str, fingerprint: str):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.repos = {}
+        self.used = set()
+        self.stats = Counter()
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            # Другие email — сохранённые коммиты отфильтрованы не так, начинаем заново
+            if data.get("fingerprint") == fingerprint:
+                self.repos = data.get("repos", {})
+            # Предохранители не зависят от email
+            BREAKERS.restore(data.get("breakers", {}))
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def get(self, key: str) -> dict | None:
+        with self._lock:
+            self.used.add(key)
+            return self.repos.get(key)
+
+    def put(self, key: str, entry: dict):
+        with self._lock:
+            self.used.add(key)
+            self.repos[key] = entry
+
+    def count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def save(self):
+        """Записать состояние репозиториев, встреченных в этом запуске"""
+        if not self.path:
+            return
+        with self._lock:
+            repos = {key: self.repos[key] for key in self.used if key in self.repos}
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": self.fingerprint, "repos": repos, "breakers": BREAKERS.snapshot()}, f)
+
+
+FETCH_STATE = FetchState(STATE_FILE, json.dumps({"emails": sorted(AUTHOR_EMAILS), "username": GITHUB_USERNAME}))
+
+
+def fetch_with_state(key: str, head: str | None, from_date: datetime, fetch, slim, date_of, id_of) -> list[dict]:
+    """Коммиты репозитория с учётом состояния прошлого запуска.
+
+    При той же голове ветки — сохранённые коммиты без запросов. В режиме INCREMENTAL —
+    fetch(с отметки прошлой загрузки минус перекрытие) и слияние с сохранёнными, если полная загрузка
+    была меньше INCREMENTAL_FULL_DAYS назад. Иначе — fetch(from_date).
+    """
+    source = key.split(":", 1)[0]
+    since = from_date.isoformat()
+    stored = FETCH_STATE.get(key)
+    if head and stored and stored.get("head") == head:
+        FETCH_STATE.count(f"{source}:unchanged")
+        return [c for c in stored["commits"] if date_of(c) >= since]
+
+    # Момент начала загрузки — отметка для следующего запуска: всё, что запушено раньше, уже получено
+    started = datetime.now().replace(microsecond=0)
+    full_at = stored and stored.get("full_at")
+    incremental = (INCREMENTAL and stored and stored.get("watermark") and full_at
+                   and started - datetime.fromisoformat(full_at) < timedelta(days=INCREMENTAL_FULL_DAYS))
+    fetch_from = from_date
+    if incremental:
+        overlap = timedelta(hours=INCREMENTAL_OVERLAP_HOURS)
+        fetch_from = max(from_date, datetime.fromisoformat(stored["watermark"]) - overlap)
+        FETCH_STATE.count(f"{source}:incremental")
+
+    def merge(commits: list[dict]) -> list[dict]:
+        merged = merge_unique([[slim(c) for c in commits], stored["commits"]], key=id_of)
+        return [c for c in merged if date_of(c) >= since]
+
+    try:
+        commits = fetch(fetch_from)
+    except DeadlineExceeded as e:
+        raise DeadlineExceeded(merge(e.partial) if incremental else e.partial)
+
+    if incremental:
+        commits = merge(commits)
+    if head or INCREMENTAL:
+        FETCH_STATE.put(key, {
+            "head": head, "watermark": started.isoformat(),
+            "full_at": full_at if incremental else started.isoformat(),
+            "commits": [slim(c) for c in commits],
+        })
+    return commits
+
+
+def print_state_stats(source: str):
+    """source — префикс ключей состояния: azure или github"""
+    if FETCH_STATE.stats[f"{source}:unchanged"]:
+        log(f"   ♻️  {FETCH_STATE.stats[f'{source}:unchanged']} repositories unchanged since last run (stored commits reused)")
+    if FETCH_STATE.stats[f"{source}:incremental"]:
+        log(f"   ⏩ {FETCH_STATE.stats[f'{source}:incremental']} repositories fetched incrementally since last run")
+
+
 # === AZURE DEVOPS ===
 
 def get_azure_headers() -> dict:
@@ -45,87 +1037,236 @@ def get_azure_headers() -> dict:
     }
 
 
-def get_azure_projects() -> list[dict]:
-    url = f"https://dev.azure.com/{AZURE_ORG}/_apis/projects?api-version=7.0"
-    response = requests.get(url, headers=get_azure_headers())
-    response.raise_for_status()
-    return response.json().get("value", [])
+@lru_cache(maxsize=None)
+def azure_client() -> HttpClient:
+    return HttpClient("Azure DevOps", "https://dev.azure.com/", get_azure_headers(), AZURE_POOL_SIZE, AZURE_CONCURRENCY)
 
 
-def get_azure_repositories(project_name: str) -> list[dict]:
-    url = f"https://dev.azure.com/{AZURE_ORG}/{project_name}/_apis/git/repositories?api-version=7.0"
-    response = requests.get(url, headers=get_azure_headers())
-    if response.status_code == 404:
-        return []
+def get_azure_org_repositories() -> list[dict]:
+    """Все Git-репозитории организации одним запросом (у каждого есть project)"""
+    url = f"https://dev.azure.com/{AZURE_ORG}/_apis/git/repositories?api-version=7.0"
+    response = azure_client().get(url)
     response.raise_for_status()
-    return response.json().get("value", [])
+    return decode_json(response).get("value", [])
 
 
-def get_azure_commits(project_name: str, repo_id: str, from_date: datetime) -> list[dict]:
-    url = f"https://dev.azure.com/{AZURE_ORG}/{project_name}/_apis/git/repositories/{repo_id}/commits"
+def get_azure_commit_page(project_name: str, repo_id: str, criteria: dict, skip: int) -> list[dict]:
+    """Одна страница коммитов: GET .../commits или POST .../commitsbatch (см. AZURE_COMMITS_API)"""
+    url = f"https://dev.azure.com/{AZURE_ORG}/{project_name}/_apis/git/repositories/{repo_id}"
     params = {
         "api-version": "7.0",
-        "searchCriteria.fromDate": from_date.isoformat(),
-        "$top": 10000,
+        "$top": AZURE_PAGE_SIZE,
+        "$skip": skip,
     }
 
-    all_commits = []
-    skip = 0
+    if AZURE_COMMITS_API == "batch":
+        # Критерии в теле запроса, а не в строке запроса
+        response = azure_client().post(f"{url}/commitsbatch", params=params, json=criteria, idempotent=True,
+                                       hedge=True, stream=AZURE_STREAM_JSON)
+    else:
+        params.update({f"searchCriteria.{name}": value for name, value in criteria.items()})
+        # Не кэшируем: fromDate сдвигается каждый день (и с каждой отметкой INCREMENTAL), 304 не бывает
+        response = azure_client().get(f"{url}/commits", params=params, hedge=True, cache=False,
+                                      stream=AZURE_STREAM_JSON)
 
-    while True:
-        params["$skip"] = skip
-        response = requests.get(url, headers=get_azure_headers(), params=params)
+    with response:
         if response.status_code == 404:
-            break
+            return []
         response.raise_for_status()
+        if AZURE_STREAM_JSON:
+            return [slim_azure_commit(c) for c in iter_json_array(iter_text(response), key="value")]
+        return decode_json(response).get("value", [])
+
 
-        commits = response.json().get("value", [])
+def get_azure_commits(project_name: str, repo_id: str, from_date: datetime, author: str = None,
+                      to_date: datetime = None) -> list[dict]:
+    criteria = {"fromDate": from_date.isoformat()}
+    if to_date:
+        criteria["toDate"] = to_date.isoformat()
+    if author:
+        criteria["author"] = author
+
+    all_commits = []
+    seen = set()
+    skip = 0
+
+    while True:
+        try:
+            page = get_azure_commit_page(project_name, repo_id, criteria, skip)
+        except DeadlineExceeded:
+            raise DeadlineExceeded(all_commits)
+        # toDate включительный: коммиты на границе курсора приходят повторно
+        commits = [c for c in page if c["commitId"] not in seen]
         if not commits:
             break
 
         all_commits.extend(commits)
-        skip += len(commits)
+        seen.update(c["commitId"] for c in commits)
 
-        if len(commits) < 10000:
+        if len(page) < AZURE_PAGE_SIZE:
             break
 
+        if AZURE_PAGINATION == "cursor":
+            dates = [commit_date(c) for c in page]
+            if min(dates) == max(dates):
+                # Вся страница с одной датой — курсор не сдвинется: эту дату дочитываем через $skip
+                skip += len(page)
+            else:
+                criteria["toDate"] = min(dates)
+                skip = 0
+        else:
+            skip += len(page)
+
     return all_commits
 
 
+def slim_azure_commit(commit: dict) -> dict:
+    """Только поля, которые используются дальше: id, email и дата автора, дата коммиттера"""
+    return {
+        "commitId": commit["commitId"],
+        "author": {"email": commit.get("author", {}).get("email", ""), "date": commit.get("author", {}).get("date", "")},
+        "committer": {"date": commit.get("committer", {}).get("date", "")},
+    }
+
+
+def get_azure_head(project_name: str, repo: dict) -> str | None:
+    """Коммит на вершине ветки по умолчанию"""
+    branch = repo.get("defaultBranch")
+    if not branch:
+        return None
+    url = f"https://dev.azure.com/{AZURE_ORG}/{project_name}/_apis/git/repositories/{repo['id']}/refs"
+    response = azure_client().get(url, params={"api-version": "7.0", "filter": branch.removeprefix("refs/")})
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    # filter — это префикс: ищем точное совпадение
+    return next((ref["objectId"] for ref in decode_json(response).get("value", []) if ref["name"] == branch), None)
+
+
+def get_azure_heads(repos: list[tuple[str, dict]]) -> dict[str, str]:
+    """Головы веток по умолчанию: id репозитория -> sha (запросы refs параллельно).
+
+    Проекты с незамкнутым предохранителем не проверяются; ошибка проверки — репозиторий загружается целиком.
+    """
+    repos = [(project_name, repo) for project_name, repo in repos if BREAKERS.closed(f"azure:{project_name}")]
+    failed = []
+
+    def check(item: tuple[str, dict]) -> str | None:
+        try:
+            return get_azure_head(*item)
+        except Exception as e:
+            failed.append(e)
+            return None
+
+    heads = run_parallel(check, repos, AZURE_CONCURRENCY)
+    if failed:
+        log(f"   ⚠️  Branch tip check failed for {len(failed)} repositories, fetching them in full: {failed[0]}")
+    return {repo["id"]: head for (_, repo), head in zip(repos, heads) if head}
+
+
+def commit_date(commit: dict) -> str:
+    """Дата коммита Azure DevOps, по которой фильтруют fromDate/toDate"""
+    return commit.get("committer", {}).get("date") or commit.get("author", {}).get("date", "")
+
+
+def azure_author_queries(emails: list[str]) -> list[str]:
+    """Значения searchCriteria.author для запросов; [None] — один запрос без фильтра"""
+    if AZURE_SERVER_AUTHOR_FILTER and emails:
+        return emails
+    return [None]
+
+
+def get_azure_author_commits(project_name: str, repo_id: str, from_date: datetime, emails: list[str],
+                             windows: int = 1) -> list[dict]:
+    """Коммиты репозитория: по запросу на каждый email и окно дат, без дубликатов по commitId"""
+    queries = [(author, window) for author in azure_author_queries(emails) for window in date_windows(from_date, windows)]
+
+    def run(query: tuple) -> list[dict]:
+        author, (since, until) = query
+        return get_azure_commits(project_name, repo_id, since, author, until)
+
+    return merge_query_results(run, queries, key=lambda c: c["commitId"])
+
+
 def fetch_azure_commits(from_date: datetime, emails: list[str]) -> list[dict]:
     """Собрать все коммиты из Azure DevOps"""
     if not AZURE_PAT or not AZURE_ORG:
-        print("⏭️  Azure DevOps: skipped (no credentials)")
+        log("⏭️  Azure DevOps: skipped (no credentials)")
         return []
 
     all_commits = []
-    print(f"\n🔷 Azure DevOps ({AZURE_ORG})")
+    log(f"\n🔷 Azure DevOps ({AZURE_ORG})")
+
+    heads = {}
+
+    def fetch_repo(item: tuple[str, dict]) -> list[dict]:
+        project_name, repo = item
+        windows = shard_count(f"{project_name}/{repo['name']}")
+        return fetch_guarded(f"azure:{project_name}", f"{project_name}/{repo['name']}", lambda: fetch_with_state(
+            f"azure:{repo['id']}", heads.get(repo["id"]), from_date,
+            lambda since: get_azure_author_commits(project_name, repo["id"], since, emails, windows),
+            slim_azure_commit, commit_date, lambda c: c["commitId"],
+        ))
 
     try:
-        projects = get_azure_projects()
-        print(f"   Found {len(projects)} projects")
+        if FETCH_ENGINE == "async":
+            repos, results = asyncio.run(async_fetch_azure_repo_commits(from_date, emails))
+        else:
+            repos = [(repo["project"]["name"], repo) for repo in get_azure_org_repositories()]
+            print_azure_repo_count(repos)
+            repos = prune_azure_repos(repos, from_date, emails)
+            if FETCH_STATE.enabled:
+                # refs — отдельный запрос на репозиторий: окупается, только если коммиты требуют больше одного
+                queries = len(azure_author_queries(emails))
+                heads.update(get_azure_heads([(project_name, repo) for project_name, repo in repos
+                                              if queries * shard_count(f"{project_name}/{repo['name']}") > 1]))
+
+            results = run_parallel(fetch_repo, repos, AZURE_CONCURRENCY)
+            print_state_stats("azure")
+
+        for (project_name, repo), commits in zip(repos, results):
+            # Фильтрация по email (страховка: серверный фильтр автора неточный)
+            commits = filter_azure_commits(commits, emails)
+            if commits:
+                log(f"   📦 {project_name}/{repo['name']}: {len(commits)} commits")
+                all_commits.extend(commits)
 
-        for project in projects:
-            project_name = project["name"]
-            repos = get_azure_repositories(project_name)
+    except Exception as e:
+        log(f"   ❌ Error: {e}")
 
-            for repo in repos:
-                repo_name = repo["name"]
-                repo_id = repo["id"]
+    return all_commits
 
-                commits = get_azure_commits(project_name, repo_id, from_date)
-                # Фильтрация по email
-                if emails:
-                    commits = [c for c in commits if c.get("author", {}).get("email", "").lower() in emails]
 
-                if commits:
-                    print(f"   📦 {project_name}/{repo_name}: {len(commits)} commits")
-                    all_commits.extend(commits)
+def prune_azure_repos(repos: list[tuple[str, dict]], from_date: datetime, emails: list[str]) -> list[tuple[str, dict]]:
+    """Убрать отключённые и пустые репозитории (и, если включено, репозитории устаревших проектов)"""
+    if not PRUNE_REPOS:
+        return repos
 
-    except Exception as e:
-        print(f"   ❌ Error: {e}")
+    since = from_date.strftime("%Y-%m-%dT%H:%M:%SZ")
+    kept = []
+    saved = 0
+    for project_name, repo in repos:
+        stale_project = AZURE_PRUNE_STALE_PROJECTS and (repo.get("project", {}).get("lastUpdateTime") or since) < since
+        if repo.get("isDisabled") or repo.get("size") == 0 or stale_project:
+            # Минимум по запросу на каждый email и окно дат
+            saved += len(azure_author_queries(emails)) * shard_count(f"{project_name}/{repo['name']}")
+        else:
+            kept.append((project_name, repo))
 
-    return all_commits
+    print_pruned(len(repos) - len(kept), saved)
+    return kept
+
+
+def print_azure_repo_count(repos: list[tuple[str, dict]]):
+    projects = {project_name for project_name, _ in repos}
+    log(f"   Found {len(repos)} repositories in {len(projects)} projects")
+
+
+def filter_azure_commits(commits: list[dict], emails: list[str]) -> list[dict]:
+    """Оставить коммиты Azure DevOps с нужными email"""
+    if not emails:
+        return commits
+    return [c for c in commits if c.get("author", {}).get("email", "").lower() in emails]
 
 
 # === GITHUB ===
@@ -138,6 +1279,11 @@ def get_github_headers() -> dict:
     }
 
 
+@lru_cache(maxsize=None)
+def github_client() -> HttpClient:
+    return HttpClient("GitHub", "https://api.github.com/", get_github_headers(), GITHUB_POOL_SIZE, GITHUB_CONCURRENCY)
+
+
 def get_github_repos() -> list[dict]:
     """Получить все репозитории пользователя"""
     repos = []
@@ -145,10 +1291,10 @@ def get_github_repos() -> list[dict]:
 
     while True:
         url = f"https://api.github.com/user/repos?per_page=100&page={page}&affiliation=owner,collaborator,organization_member"
-        response = requests.get(url, headers=get_github_headers())
+        response = github_client().get(url)
         response.raise_for_status()
 
-        data = response.json()
+        data = decode_json(response)
         if not data:
             break
 
@@ -161,7 +1307,8 @@ def get_github_repos() -> list[dict]:
     return repos
 
 
-def get_github_commits(owner: str, repo: str, from_date: datetime, author: str = None) -> list[dict]:
+def get_github_commits(owner: str, repo: str, from_date: datetime, author: str = None,
+                       to_date: datetime = None) -> list[dict]:
     """Получить коммиты из GitHub репозитория"""
     commits = []
     page = 1
@@ -173,10 +1320,16 @@ def get_github_commits(owner: str, repo: str, from_date: datetime, author: str =
             "per_page": 100,
             "page": page,
         }
+        if to_date:
+            params["until"] = to_date.isoformat()
         if author:
             params["author"] = author
 
-        response = requests.get(url, headers=get_github_headers(), params=params)
+        try:
+            # Не кэшируем: since сдвигается каждый день (и с каждой отметкой INCREMENTAL), 304 не бывает
+            response = github_client().get(url, params=params, hedge=True, cache=False)
+        except DeadlineExceeded:
+            raise DeadlineExceeded(commits)
 
         if response.status_code == 409:  # Empty repository
             break
@@ -184,7 +1337,7 @@ def get_github_commits(owner: str, repo: str, from_date: datetime, author: str =
             break
         response.raise_for_status()
 
-        data = response.json()
+        data = decode_json(response)
         if not data:
             break
 
@@ -200,48 +1353,501 @@ def get_github_commits(owner: str, repo: str, from_date: datetime, author: str =
 def fetch_github_commits(from_date: datetime, emails: list[str]) -> list[dict]:
     """Собрать все коммиты из GitHub"""
     if not GITHUB_TOKEN:
-        print("⏭️  GitHub: skipped (no token)")
+        log("⏭️  GitHub: skipped (no token)")
         return []
 
     all_commits = []
-    print(f"\n🐙 GitHub")
+    log(f"\n🐙 GitHub ({GITHUB_BACKEND})")
 
     try:
+        all_commits = GITHUB_BACKENDS[GITHUB_BACKEND](from_date, emails)
+    except Exception as e:
+        log(f"   ❌ Error: {e}")
+
+    return all_commits
+
+
+def fetch_github_rest(from_date: datetime, emails: list[str]) -> list[dict]:
+    """Backend rest: список репозиториев и история коммитов каждого"""
+
+    heads = {}
+
+    def fetch_repo(repo: dict) -> list[dict]:
+        owner = repo["owner"]["login"]
+        repo_name = repo["name"]
+
+        # Получаем коммиты для каждого email или для username
+        windows = shard_count(f"{owner}/{repo_name}")
+        return fetch_guarded(f"github:{owner}", f"{owner}/{repo_name}", lambda: fetch_with_state(
+            f"github:{owner}/{repo_name}", heads.get(f"{owner}/{repo_name}"), from_date,
+            lambda since: get_github_author_commits(owner, repo_name, since, emails, windows),
+            slim_github_commit, lambda c: c["commit"].get("committer", {}).get("date") or c["commit"]["author"]["date"],
+            lambda c: c["sha"],
+        ))
+
+    if FETCH_ENGINE == "async":
+        repos, results = asyncio.run(async_fetch_github_repo_commits(from_date, emails))
+    else:
         repos = get_github_repos()
-        print(f"   Found {len(repos)} repositories")
+        log(f"   Found {len(repos)} repositories")
+        repos = prune_github_repos(repos, from_date, lambda repo: len(github_author_queries(emails)) * shard_count(repo["full_name"]))
+        if FETCH_STATE.enabled:
+            heads.update(get_github_heads(repos))
 
-        for repo in repos:
-            owner = repo["owner"]["login"]
-            repo_name = repo["name"]
+        results = run_parallel(fetch_repo, repos, GITHUB_CONCURRENCY)
+        print_state_stats("github")
 
-            # Получаем коммиты для каждого email или для username
-            commits = []
-            if GITHUB_USERNAME:
-                commits = get_github_commits(owner, repo_name, from_date, GITHUB_USERNAME)
-            else:
-                commits = get_github_commits(owner, repo_name, from_date)
+    return collect_github_results(repos, results, emails)
 
-            # Фильтрация по email если указаны
-            if emails and commits:
-                commits = [c for c in commits if c.get("commit", {}).get("author", {}).get("email", "").lower() in emails]
 
-            if commits:
-                print(f"   📦 {owner}/{repo_name}: {len(commits)} commits")
-                # Преобразуем в общий формат
-                for c in commits:
-                    all_commits.append({
-                        "author": {
-                            "email": c.get("commit", {}).get("author", {}).get("email", ""),
-                            "date": c.get("commit", {}).get("author", {}).get("date", ""),
-                        }
-                    })
+def slim_github_commit(commit: dict) -> dict:
+    """Только поля, которые используются дальше: sha, email и дата автора, дата коммиттера"""
+    data = commit.get("commit", {})
+    return {
+        "sha": commit["sha"],
+        "commit": {
+            "author": {"email": data.get("author", {}).get("email", ""), "date": data.get("author", {}).get("date", "")},
+            "committer": {"date": (data.get("committer") or {}).get("date", "")},
+        },
+    }
 
-    except Exception as e:
-        print(f"   ❌ Error: {e}")
 
+def get_github_heads(repos: list[dict]) -> dict[str, str]:
+    """Головы веток по умолчанию: "owner/name" -> sha, GraphQL по 100 репозиториев за запрос.
+
+    Владельцы с незамкнутым предохранителем не проверяются; ошибка пачки — её репозитории загружаются целиком.
+    """
+    failed = []
+
+    def run(batch: list[dict]) -> dict[str, str]:
+        fields = [
+            f"r{i}: repository(owner: {json.dumps(repo['owner']['login'])}, name: {json.dumps(repo['name'])}) {{"
+            f" defaultBranchRef {{ target {{ oid }} }} }}"
+            for i, repo in enumerate(batch)
+        ]
+        try:
+            data = github_graphql("query {\n" + "\n".join(fields) + "\n}", {}, partial=True)
+        except Exception as e:
+            failed.append((len(batch), e))
+            return {}
+        heads = {}
+        for i, repo in enumerate(batch):
+            oid = (((data.get(f"r{i}") or {}).get("defaultBranchRef") or {}).get("target") or {}).get("oid")
+            if oid:
+                heads[f"{repo['owner']['login']}/{repo['name']}"] = oid
+        return heads
+
+    repos = [repo for repo in repos if BREAKERS.closed(f"github:{repo['owner']['login']}")]
+    batches = [repos[i:i + 100] for i in range(0, len(repos), 100)]
+    results = run_parallel(run, batches, GITHUB_CONCURRENCY)
+    if failed:
+        log(f"   ⚠️  Branch tip check failed for {sum(n for n, _ in failed)} repositories, "
+            f"fetching them in full: {failed[0][1]}")
+    return {name: oid for heads in results for name, oid in heads.items()}
+
+
+def prune_github_repos(repos: list[dict], from_date: datetime, requests_per_repo) -> list[dict]:
+    """Убрать репозитории без пушей с начала периода (в том числе архивные)"""
+    if not PRUNE_REPOS:
+        return repos
+
+    # Архивный репозиторий, заархивированный уже в периоде, мог получить коммиты — его отсекает та же проверка pushed_at
+    since = from_date.strftime("%Y-%m-%dT%H:%M:%SZ")
+    kept = []
+    saved = 0
+    for repo in repos:
+        if repo.get("pushed_at") and repo["pushed_at"] < since:
+            saved += requests_per_repo(repo)
+        else:
+            kept.append(repo)
+
+    print_pruned(len(repos) - len(kept), math.ceil(saved))
+    return kept
+
+
+def collect_github_results(repos: list[dict], results: list[list[dict]], emails: list[str]) -> list[dict]:
+    """Отфильтровать коммиты по email, напечатать итоги по репозиториям и привести к общему формату"""
+    all_commits = []
+    for repo, commits in zip(repos, results):
+        commits = filter_github_commits(commits, emails)
+        if commits:
+            log(f"   📦 {repo['owner']['login']}/{repo['name']}: {len(commits)} commits")
+            all_commits.extend(to_common_format(c) for c in commits)
+
+    return all_commits
+
+
+def github_graphql(query: str, variables: dict, partial: bool = False) -> dict:
+    """Выполнить GraphQL-запрос к GitHub и вернуть data; partial — не падать, если часть полей null с ошибкой"""
+    response = github_client().post("https://api.github.com/graphql", json={"query": query, "variables": variables},
+                                    idempotent=True)
+    response.raise_for_status()
+    payload = decode_json(response)
+    if payload.get("errors") and not (partial and payload.get("data")):
+        raise RuntimeError(f"GraphQL: {payload['errors'][0].get('message', payload['errors'])}")
+    return payload["data"]
+
+
+CONTRIBUTION_CALENDAR_QUERY = """
+query($login: String!, $from: DateTime!, $to: DateTime!) {
+  user(login: $login) {
+    contributionsCollection(from: $from, to: $to) {
+      contributionCalendar { weeks { contributionDays { date contributionCount } } }
+    }
+  }
+}
+"""
+
+
+def fetch_github_calendar(from_date: datetime, emails: list[str]) -> list[dict]:
+    """Backend calendar: дневные суммы из contributionCalendar одним запросом (emails не используются)"""
+    login = GITHUB_USERNAME
+    if not login:
+        login = github_graphql("query { viewer { login } }", {})["viewer"]["login"]
+
+    # Интервал contributionsCollection — не больше года (from_date округлён до полуночи и может быть дальше)
+    now = datetime.now()
+    data = github_graphql(CONTRIBUTION_CALENDAR_QUERY, {
+        "login": login,
+        "from": max(from_date, now - timedelta(days=365)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "to": now.strftime("%Y-%m-%dT%H:%M:%SZ"),
+    })
+    calendar = data["user"]["contributionsCollection"]["contributionCalendar"]
+
+    # По записи на каждый вклад, чтобы aggregate_by_date считал их как коммиты
+    all_commits = []
+    for week in calendar["weeks"]:
+        for day in week["contributionDays"]:
+            all_commits.extend({"author": {"email": "", "date": day["date"]}} for _ in range(day["contributionCount"]))
+
+    log(f"   📅 {login}: {len(all_commits)} contributions")
     return all_commits
 
 
+def github_history_author(emails: list[str]) -> str:
+    """Аргумент author для history(): emails, иначе id пользователя GH_USERNAME, иначе без фильтра"""
+    if emails:
+        return f"author: {{emails: {json.dumps(emails)}}}"
+    if GITHUB_USERNAME:
+        user_id = github_graphql("query($login: String!) { user(login: $login) { id } }", {"login": GITHUB_USERNAME})["user"]["id"]
+        return f"author: {{id: {json.dumps(user_id)}}}"
+    return ""
+
+
+def get_github_history_batch(batch: list[tuple[dict, str | None]], since: str, author_arg: str) -> list[dict]:
+    """История по умолчательной ветке для нескольких репозиториев одним запросом (алиасы r0, r1, ...)"""
+    fields = []
+    for i, (repo, cursor) in enumerate(batch):
+        args = ["first: 100", f"since: {json.dumps(since)}"]
+        if author_arg:
+            args.append(author_arg)
+        if cursor:
+            args.append(f"after: {json.dumps(cursor)}")
+        fields.append(
+            f"r{i}: repository(owner: {json.dumps(repo['owner']['login'])}, name: {json.dumps(repo['name'])}) {{"
+            f" defaultBranchRef {{ target {{ ... on Commit {{ history({', '.join(args)}) {{"
+            f" pageInfo {{ hasNextPage endCursor }} nodes {{ oid authoredDate author {{ email }} }}"
+            f" }} }} }} }} }}"
+        )
+    data = github_graphql("query {\n" + "\n".join(fields) + "\n}", {}, partial=True)
+    return [data.get(f"r{i}") for i in range(len(batch))]
+
+
+def fetch_github_graphql(from_date: datetime, emails: list[str]) -> list[dict]:
+    """Backend graphql: история GITHUB_GRAPHQL_BATCH репозиториев за запрос, только oid и дата автора"""
+    repos = get_github_repos()
+    log(f"   Found {len(repos)} repositories")
+    # Запрос на батч, а не на репозиторий — экономия считается долями батча
+    repos = prune_github_repos(repos, from_date, lambda repo: 1 / GITHUB_GRAPHQL_BATCH)
+
+    since = from_date.strftime("%Y-%m-%dT%H:%M:%SZ")
+    author_arg = github_history_author(emails)
+    results = [[] for _ in repos]
+
+    # Раунды: в каждом — следующая страница всех репозиториев, у которых она есть
+    pending = [(i, None) for i in range(len(repos))]
+    while pending:
+        batches = [pending[i:i + GITHUB_GRAPHQL_BATCH] for i in range(0, len(pending), GITHUB_GRAPHQL_BATCH)]
+
+        def run(batch: list[tuple[int, str | None]]) -> list[dict]:
+            return get_github_history_batch([(repos[i], cursor) for i, cursor in batch], since, author_arg)
+
+        pending = []
+        for batch, answers in zip(batches, run_parallel(run, batches, GITHUB_CONCURRENCY)):
+            for (i, _), answer in zip(batch, answers):
+                # null — репозиторий недоступен или пустой (нет ветки по умолчанию)
+                history = ((answer or {}).get("defaultBranchRef") or {}).get("target", {}).get("history")
+                if not history:
+                    continue
+                # В формате REST, чтобы переиспользовать filter_github_commits и to_common_format
+                results[i].extend(
+                    {"sha": node["oid"], "commit": {"author": {"email": (node.get("author") or {}).get("email") or "",
+                                                              "date": node["authoredDate"]}}}
+                    for node in history["nodes"]
+                )
+                if history["pageInfo"]["hasNextPage"]:
+                    pending.append((i, history["pageInfo"]["endCursor"]))
+
+    return collect_github_results(repos, results, emails)
+
+
+GITHUB_SEARCH_CAP = 1000  # поиск отдаёт не больше 1000 результатов на запрос
+
+
+def get_github_search_page(query: str, page: int) -> dict:
+    url = "https://api.github.com/search/commits"
+    params = {"q": query, "sort": "author-date", "per_page": 100, "page": page}
+    # Окно дат в запросе сдвигается каждый день — кэш не поможет
+    response = github_client().get(url, params=params, cache=False)
+    response.raise_for_status()
+    return decode_json(response)
+
+
+def search_github_commits(author_term: str, start: datetime, end: datetime) -> list[dict]:
+    """Коммиты из поиска за start..end; окно, упёршееся в лимит выдачи, делится пополам"""
+    query = f"{author_term} author-date:{start.strftime('%Y-%m-%dT%H:%M:%S')}..{end.strftime('%Y-%m-%dT%H:%M:%S')}"
+    first = get_github_search_page(query, 1)
+    total = first.get("total_count", 0)
+
+    if total > GITHUB_SEARCH_CAP and end - start > timedelta(minutes=1):
+        middle = start + (end - start) / 2
+        halves = [(start, middle), (middle + timedelta(seconds=1), end)]
+        batches = run_parallel(lambda window: search_github_commits(author_term, *window), halves, len(halves))
+        return merge_unique(batches, key=lambda c: c["sha"])
+
+    # Число страниц известно после первой — остальные грузим параллельно
+    pages = range(2, (min(total, GITHUB_SEARCH_CAP) + 99) // 100 + 1)
+    rest = run_parallel(lambda page: get_github_search_page(query, page).get("items", []), list(pages), GITHUB_CONCURRENCY)
+    return merge_unique([first.get("items", [])] + rest, key=lambda c: c["sha"])
+
+
+def fetch_github_search(from_date: datetime, emails: list[str]) -> list[dict]:
+    """Backend search: поиск коммитов по author-email (или author) без перебора репозиториев"""
+    terms = [f"author-email:{email}" for email in emails] or ([f"author:{GITHUB_USERNAME}"] if GITHUB_USERNAME else [])
+    if not terms:
+        raise ValueError("GITHUB_BACKEND=search needs AUTHOR_EMAILS or GH_USERNAME")
+
+    now = datetime.now()
+    batches = run_parallel(lambda term: search_github_commits(term, from_date, now), terms, len(terms))
+    commits = merge_unique(batches, key=lambda c: c["sha"])
+
+    # Группируем по репозиториям для отчёта
+    by_repo = defaultdict(list)
+    for commit in commits:
+        by_repo[commit["repository"]["full_name"]].append(commit)
+    repos = [{"owner": {"login": name.split("/")[0]}, "name": name.split("/", 1)[1]} for name in by_repo]
+    return collect_github_results(repos, list(by_repo.values()), emails)
+
+
+# Способы получить коммиты GitHub (GITHUB_BACKEND)
+GITHUB_BACKENDS = {
+    "rest": fetch_github_rest,
+    "calendar": fetch_github_calendar,
+    "graphql": fetch_github_graphql,
+    "search": fetch_github_search,
+}
+
+
+def github_author_queries(emails: list[str]) -> list[str]:
+    """Значения параметра author: каждый email, иначе username; [None] — один запрос без фильтра"""
+    # С email-ами запрос по username лишний: его результат всё равно фильтруется по email
+    if emails:
+        return emails
+    return [GITHUB_USERNAME or None]
+
+
+def get_github_author_commits(owner: str, repo: str, from_date: datetime, emails: list[str],
+                              windows: int = 1) -> list[dict]:
+    """Коммиты репозитория: по запросу на каждого автора и окно дат, без дубликатов по sha"""
+    queries = [(author, window) for author in github_author_queries(emails) for window in date_windows(from_date, windows)]
+
+    def run(query: tuple) -> list[dict]:
+        author, (since, until) = query
+        return get_github_commits(owner, repo, since, author, until)
+
+    return merge_query_results(run, queries, key=lambda c: c["sha"])
+
+
+def filter_github_commits(commits: list[dict], emails: list[str]) -> list[dict]:
+    """Оставить коммиты GitHub с нужными email"""
+    if not emails:
+        return commits
+    return [c for c in commits if c.get("commit", {}).get("author", {}).get("email", "").lower() in emails]
+
+
+def to_common_format(commit: dict) -> dict:
+    """Преобразовать коммит GitHub в общий формат (как у Azure DevOps)"""
+    author = commit.get("commit", {}).get("author", {})
+    return {
+        "author": {
+            "email": author.get("email", ""),
+            "date": author.get("date", ""),
+        }
+    }
+
+
+# === ASYNC ДВИЖОК ===
+# Зеркало синхронных функций на aiohttp: тысячи запросов в полёте в одном потоке.
+# Включается через FETCH_ENGINE=async; по умолчанию используется синхронный путь.
+
+class AsyncHttpClient:
+    """Асинхронный клиент одного хоста: общая aiohttp-сессия и семафор запросов в полёте"""
+
+    def __init__(self, session: "aiohttp.ClientSession", max_concurrency: int):
+        self.session = session
+        self._slots = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def get_json(self, url: str, params: dict = None, missing: tuple = (404,)):
+        """GET с разбором JSON; для статусов из missing возвращает None"""
+        if params:
+            params = {k: str(v) for k, v in params.items()}
+        async with self._slots:
+            async with self.session.get(url, params=params) as response:
+                if response.status in missing:
+                    return None
+                response.raise_for_status()
+                return loads_json(await response.read())
+
+
+def open_async_session(headers: dict) -> "aiohttp.ClientSession":
+    if aiohttp is None:
+        raise RuntimeError("FETCH_ENGINE=async requires aiohttp (pip install aiohttp)")
+    connector = aiohttp.TCPConnector(limit_per_host=ASYNC_CONCURRENCY)
+    timeout = aiohttp.ClientTimeout(sock_connect=HTTP_CONNECT_TIMEOUT, sock_read=HTTP_READ_TIMEOUT)
+    return aiohttp.ClientSession(headers=headers, connector=connector, timeout=timeout)
+
+
+async def async_get_azure_org_repositories(client: AsyncHttpClient) -> list[dict]:
+    url = f"https://dev.azure.com/{AZURE_ORG}/_apis/git/repositories?api-version=7.0"
+    data = await client.get_json(url, missing=())
+    return data.get("value", [])
+
+
+async def async_iter_azure_commit_pages(client: AsyncHttpClient, project_name: str, repo_id: str, from_date: datetime,
+                                        author: str = None):
+    """Асинхронный генератор страниц коммитов Azure DevOps"""
+    url = f"https://dev.azure.com/{AZURE_ORG}/{project_name}/_apis/git/repositories/{repo_id}/commits"
+    params = {
+        "api-version": "7.0",
+        "searchCriteria.fromDate": from_date.isoformat(),
+        "$top": AZURE_PAGE_SIZE,
+    }
+    if author:
+        params["searchCriteria.author"] = author
+    skip = 0
+
+    while True:
+        params["$skip"] = skip
+        data = await client.get_json(url, params=params)
+        commits = data.get("value", []) if data else []
+        if not commits:
+            break
+
+        yield commits
+        skip += len(commits)
+
+        if len(commits) < AZURE_PAGE_SIZE:
+            break
+
+
+async def async_get_azure_commits(client: AsyncHttpClient, project_name: str, repo_id: str, from_date: datetime,
+                                  author: str = None) -> list[dict]:
+    return [c async for page in async_iter_azure_commit_pages(client, project_name, repo_id, from_date, author) for c in page]
+
+
+async def async_get_azure_author_commits(client: AsyncHttpClient, project_name: str, repo_id: str, from_date: datetime,
+                                         emails: list[str]) -> list[dict]:
+    batches = await asyncio.gather(*(
+        async_get_azure_commits(client, project_name, repo_id, from_date, author) for author in azure_author_queries(emails)
+    ))
+    return merge_unique(batches, key=lambda c: c["commitId"])
+
+
+async def async_fetch_azure_repo_commits(from_date: datetime, emails: list[str]) -> tuple[list[tuple[str, dict]], list[list[dict]]]:
+    """Список репозиториев Azure DevOps и их коммиты (в том же порядке)"""
+    async with open_async_session(get_azure_headers()) as session:
+        client = AsyncHttpClient(session, ASYNC_CONCURRENCY)
+        repos = [(repo["project"]["name"], repo) for repo in await async_get_azure_org_repositories(client)]
+        print_azure_repo_count(repos)
+        repos = prune_azure_repos(repos, from_date, emails)
+
+        results = await asyncio.gather(*(
+            async_get_azure_author_commits(client, name, repo["id"], from_date, emails) for name, repo in repos
+        ))
+        return repos, list(results)
+
+
+async def async_get_github_repos(client: AsyncHttpClient) -> list[dict]:
+    repos = []
+    page = 1
+
+    while True:
+        url = f"https://api.github.com/user/repos?per_page=100&page={page}&affiliation=owner,collaborator,organization_member"
+        data = await client.get_json(url, missing=())
+        if not data:
+            break
+
+        repos.extend(data)
+        page += 1
+
+        if len(data) < 100:
+            break
+
+    return repos
+
+
+async def async_iter_github_commit_pages(client: AsyncHttpClient, owner: str, repo: str, from_date: datetime, author: str = None):
+    """Асинхронный генератор страниц коммитов GitHub"""
+    url = f"https://api.github.com/repos/{owner}/{repo}/commits"
+    page = 1
+
+    while True:
+        params = {
+            "since": from_date.isoformat(),
+            "per_page": 100,
+            "page": page,
+        }
+        if author:
+            params["author"] = author
+
+        # 409 — пустой репозиторий
+        data = await client.get_json(url, params=params, missing=(404, 409))
+        if not data:
+            break
+
+        yield data
+        page += 1
+
+        if len(data) < 100:
+            break
+
+
+async def async_get_github_commits(client: AsyncHttpClient, owner: str, repo: str, from_date: datetime, author: str = None) -> list[dict]:
+    return [c async for page in async_iter_github_commit_pages(client, owner, repo, from_date, author) for c in page]
+
+
+async def async_get_github_author_commits(client: AsyncHttpClient, owner: str, repo: str, from_date: datetime,
+                                          emails: list[str]) -> list[dict]:
+    batches = await asyncio.gather(*(
+        async_get_github_commits(client, owner, repo, from_date, author) for author in github_author_queries(emails)
+    ))
+    return merge_unique(batches, key=lambda c: c["sha"])
+
+
+async def async_fetch_github_repo_commits(from_date: datetime, emails: list[str]) -> tuple[list[dict], list[list[dict]]]:
+    """Список репозиториев GitHub и их коммиты (в том же порядке)"""
+    async with open_async_session(get_github_headers()) as session:
+        client = AsyncHttpClient(session, ASYNC_CONCURRENCY)
+        repos = await async_get_github_repos(client)
+        log(f"   Found {len(repos)} repositories")
+        repos = prune_github_repos(repos, from_date, lambda repo: len(github_author_queries(emails)))
+
+        results = await asyncio.gather(*(
+            async_get_github_author_commits(client, repo["owner"]["login"], repo["name"], from_date, emails) for repo in repos
+        ))
+        return repos, list(results)
+
+
 # === ОБЩИЕ ФУНКЦИИ ===
 
 def aggregate_by_date(commits: list[dict]) -> dict[str, int]:
@@ -474,21 +2080,81 @@ def generate_streak_svg(commit_counts: dict[str, int], total: int, current_strea
     return '\n'.join(svg_parts)
 
 
+# Источники коммитов: (название, функция загрузки). Новый источник — ещё одна строка.
+SOURCES = [
+    ("Azure DevOps", fetch_azure_commits),
+    ("GitHub", fetch_github_commits),
+]
+
+
+def fetch_all_sources(from_date: datetime, emails: list[str]) -> dict[str, tuple[list[dict], float]]:
+    """Загрузить все источники параллельно; ошибка одного не влияет на остальные"""
+
+    def run(source: tuple) -> tuple[list[dict], float]:
+        name, fetch = source
+        started = time.monotonic()
+        # Источники работают параллельно: вывод каждого печатается одним блоком, когда он закончит
+        _log_buffer.lines = []
+        try:
+            commits = fetch(from_date, emails)
+        except Exception as e:
+            log(f"   ❌ {name}: {e}")
+            commits = []
+        finally:
+            lines, _log_buffer.lines = _log_buffer.lines, None
+            if lines:
+                with _print_lock:
+                    print("\n".join(lines))
+        return commits, time.monotonic() - started
+
+    start_deadline()
+    results = run_parallel(run, SOURCES, len(SOURCES))
+    return {name: result for (name, _), result in zip(SOURCES, results)}
+
+
+def print_http_stats():
+    if not HTTP_CLIENTS:
+        return
+    print("\n🌐 HTTP")
+    for client in HTTP_CLIENTS:
+        line = f"   {client.name}: {client.stats['requests']} requests"
+        if HTTP_CACHE.path:
+            line += f", {client.stats['not_modified']} served from cache (304)"
+        if client.stats["retries"]:
+            line += f", {client.stats['retries']} retries"
+        if client.stats["hedged"]:
+            line += f", {client.stats['hedged']} hedged ({client.stats['hedge_wins']} won by the duplicate)"
+        if client.stats["throttled_seconds"] >= 1:
+            line += f", {client.stats['throttled_seconds']:.0f}s waiting for rate limit"
+        print(line)
+
+
 def main():
     print("🚀 GitHub + Azure DevOps Commits Heatmap Generator")
     print(f"   Author emails: {AUTHOR_EMAILS or 'all'}")
 
-    from_date = datetime.now() - timedelta(days=365)
-
-    # Собираем коммиты из обоих источников
-    azure_commits = fetch_azure_commits(from_date, AUTHOR_EMAILS)
-    github_commits = fetch_github_commits(from_date, AUTHOR_EMAILS)
-
-    all_commits = azure_commits + github_commits
+    # С начала суток: одинаковые параметры запросов в течение дня — больше попаданий в HTTP-кэш
+    from_date = (datetime.now() - timedelta(days=365)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    # Собираем коммиты из всех источников параллельно
+    results = fetch_all_sources(from_date, AUTHOR_EMAILS)
+    HTTP_CACHE.save()
+    FETCH_STATE.save()
+    print_http_stats()
+    if INCOMPLETE_REPOS:
+        print(f"\n⏳ Fetch deadline reached, {len(INCOMPLETE_REPOS)} repositories incomplete:")
+        for name in sorted(INCOMPLETE_REPOS):
+            print(f"   {name}")
+    if SKIPPED_REPOS:
+        print(f"\n⛔ {len(SKIPPED_REPOS)} repositories skipped:")
+        for name, reason in sorted(SKIPPED_REPOS.items()):
+            print(f"   {name}: {reason}")
+
+    all_commits = [c for commits, _ in results.values() for c in commits]
 
     print(f"\n📊 Total: {len(all_commits)} commits")
-    print(f"   Azure DevOps: {len(azure_commits)}")
-    print(f"   GitHub: {len(github_commits)}")
+    for name, (commits, elapsed) in results.items():
+        print(f"   {name}: {len(commits)} ({elapsed:.1f}s)")
 
     commit_counts = aggregate_by_date(all_commits)
 